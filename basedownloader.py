@@ -0,0 +1,715 @@
+import os
+import csv
+import atexit
+import sqlite3
+import logging
+import time
+import random
+import asyncio
+import aiofiles
+import aiohttp
+import orjson
+from aiolimiter import AsyncLimiter
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
+from pathlib import Path
+from typing import Set, Dict, Tuple
+
+from dotenv import load_dotenv
+from httpretry import request_with_retries
+load_dotenv()
+
+# Connect / per-read timeouts; media has no total limit so large videos can finish
+API_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=30)
+MEDIA_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=60)
+
+# Media bodies are streamed to disk in writes of at least this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Upper bound on hashtag pages requested per tag in one call, to protect API quota
+MAX_PAGES_PER_TAG = 5
+
+# Candidates sampled per page, as a multiple of the remaining quota; the spares cover failed downloads
+CANDIDATE_OVERSAMPLE = 3
+
+# Token bucket for media downloads: bursts up to this many requests per second
+MEDIA_REQUESTS_PER_SECOND = 5
+
+# Seconds a fetched hashtag page is reused before the API is asked again
+PAGE_CACHE_TTL = 600
+
+# Upper bound on hashtag pages held in memory; the oldest are dropped first
+PAGE_CACHE_MAX_SIZE = 128
+
+# Seconds a stored first page and its ETag are kept for revalidation on later runs
+HASHTAG_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Downloader log files rotate at this size, keeping a few old copies
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# Configure console logging once at import, unless the application already has
+if not logging.getLogger().handlers:
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+def queue_handler_for(*handlers):
+    """
+    Hand log records to the given handlers through a background listener thread,
+    so writing them never blocks the event loop
+
+    :param handlers: Handlers that format and write the records
+    :return: QueueHandler to install in their place
+    """
+    log_queue = SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    # The listener's handlers do the real formatting; the queue handler only merges the message args
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    return queue_handler
+
+def _preallocate(fd, size):
+    """
+    Reserve disk space for a download of known size, so the file is laid out
+    up front instead of growing with every write.
+    Blocking, and slow where the filesystem has no native fallocate, so it is run in an executor.
+
+    :param fd: File descriptor of the file being written
+    :param size: Expected file size in bytes
+    """
+    try:
+        # No fallocate on macOS; a sparse ftruncate would reserve nothing, so the file just grows
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, size)
+
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        # Only an optimisation, and not every filesystem supports it
+        pass
+
+class HashtagFetcher:
+    """
+    Fetches hashtag feed pages from RapidAPI on behalf of one or more downloaders.
+    Each page is fetched once per TTL and shared, so the video and image downloaders
+    searching the same tags cost a single API call per page between them.
+    """
+
+    def __init__(self, ttl=PAGE_CACHE_TTL, cache_file='download_history.db', max_pages=PAGE_CACHE_MAX_SIZE):
+        """
+        :param ttl: Seconds a fetched page is reused before it is requested again
+        :param max_pages: Maximum number of pages kept in memory
+        :param cache_file: SQLite file holding page bodies and ETags across runs
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._session = None
+        self._api_semaphore = None
+
+        # Concurrency cap for API calls, tunable per RapidAPI plan
+        self.api_concurrency = int(os.getenv('RAPID_API_CONCURRENCY', '5'))
+
+        # In-flight or finished page fetches keyed by (tag, pagination token), with their expiry
+        self._pages: Dict[Tuple[str, str], Tuple[float, asyncio.Future]] = {}
+
+        # RapidAPI configuration
+        self.rapid_api_key = os.getenv('RAPID_API_KEY')
+        self.rapid_api_host = os.getenv('RAPID_API_HOST')
+
+        # Headers for RapidAPI request; aiohttp already negotiates a compressed body
+        self.headers = {
+            'x-rapidapi-host': self.rapid_api_host,
+            'x-rapidapi-key': self.rapid_api_key
+        }
+
+        # Hashtag search endpoint, built once rather than per request
+        self._hashtag_url = f'https://{self.rapid_api_host}/v1/hashtag'
+
+        # Last first-page body per tag with its ETag, for conditional requests
+        try:
+            self.db = sqlite3.connect(cache_file, isolation_level=None)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS hashtag_cache('
+                'key TEXT PRIMARY KEY, etag TEXT, body BLOB, ts REAL)'
+            )
+
+            # Tables from older versions have no timestamp; their rows are pruned below
+            columns = {row[1] for row in self.db.execute('PRAGMA table_info(hashtag_cache)')}
+            if 'ts' not in columns:
+                self.db.execute('ALTER TABLE hashtag_cache ADD COLUMN ts REAL')
+
+            self.db.execute(
+                'DELETE FROM hashtag_cache WHERE ts IS NULL OR ts < ?',
+                (time.time() - HASHTAG_CACHE_MAX_AGE,)
+            )
+        except Exception as e:
+            self.logger.error(f"Error opening hashtag cache: {e}")
+            self.db = None
+
+    async def _get_session(self):
+        """
+        Lazily create the pooled session used for every API call
+        """
+        if self._session is None or self._session.closed:
+            # The semaphore alone caps API calls; the connector keeps aiohttp's default pool
+            self._session = aiohttp.ClientSession()
+
+            # Created here so it binds to the running event loop
+            self._api_semaphore = asyncio.Semaphore(self.api_concurrency)
+        return self._session
+
+    async def close(self):
+        """
+        Close the API session and the page cache database
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        self._pages.clear()
+
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _store_page(self, key, expires, future):
+        """
+        Add a page fetch to the in-memory cache, dropping expired pages and,
+        past the size limit, the oldest ones
+
+        :param key: (tag, pagination token) the page belongs to
+        :param expires: Monotonic time after which the page is stale
+        :param future: Future resolving to the decoded page
+        """
+        now = time.monotonic()
+        self._pages.pop(key, None)
+        for stale_key in [k for k, (expiry, _) in self._pages.items() if expiry < now]:
+            del self._pages[stale_key]
+
+        # Dicts keep insertion order, so the first entries are the oldest
+        while len(self._pages) >= self.max_pages:
+            del self._pages[next(iter(self._pages))]
+
+        self._pages[key] = (expires, future)
+
+    async def _request_page(self, tag, pagination_token=None):
+        """
+        Request one page of a hashtag feed from RapidAPI.
+        Pages seen before are revalidated with If-None-Match, so an unchanged
+        feed costs a bodyless 304 instead of a full response.
+
+        :param tag: Hashtag to search
+        :param pagination_token: Optional pagination token for the next page
+        :return: Decoded JSON response
+        """
+        session = await self._get_session()
+
+        # Query parameters
+        querystring = {"hashtag": tag}
+        if pagination_token:
+            querystring['pagination_token'] = pagination_token
+
+        # Log API request details
+        self.logger.debug("Query parameters: %s", querystring)
+
+        # Only first pages are stored: pagination tokens are opaque and never repeat across runs
+        use_cache = self.db is not None and not pagination_token
+        cached = None
+        if use_cache:
+            cached = self.db.execute(
+                'SELECT etag, body FROM hashtag_cache WHERE key = ?', (tag,)
+            ).fetchone()
+
+        headers = self.headers
+        if cached:
+            headers = {**self.headers, 'If-None-Match': cached[0]}
+
+        # Make API request with timeout, retrying throttled or failed responses
+        status, response_headers, body = await request_with_retries(
+            session,
+            'GET',
+            self._hashtag_url,
+            semaphore=self._api_semaphore,
+            headers=headers,
+            params=querystring,
+            timeout=API_TIMEOUT
+        )
+        etag = response_headers.get('ETag')
+        self.logger.debug("Response status code: %s", status)
+
+        if status not in (200, 304) or (status == 304 and not cached):
+            # An error body is not a page, so it must not be read as the end of the feed
+            self.logger.warning(f"Hashtag API returned status {status} for tag {tag}")
+            raise ValueError(f"Hashtag API returned status {status}")
+
+        if status == 304:
+            self.logger.debug("Hashtag page not modified: %s", tag)
+            body = cached[1]
+            self.db.execute('UPDATE hashtag_cache SET ts = ? WHERE key = ?', (time.time(), tag))
+        elif status == 200 and use_cache:
+            if etag:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO hashtag_cache(key, etag, body, ts) VALUES (?, ?, ?, ?)',
+                    (tag, etag, body, time.time())
+                )
+            else:
+                # Without an ETag the stored copy can no longer be revalidated
+                self.db.execute('DELETE FROM hashtag_cache WHERE key = ?', (tag,))
+
+        return orjson.loads(body)
+
+    async def fetch(self, tag, pagination_token=None):
+        """
+        Get one page of a hashtag feed, sharing the request with every caller
+        that asks for the same page while it is in flight or fresh
+
+        :param tag: Hashtag to search
+        :param pagination_token: Optional pagination token for the next page
+        :return: Decoded JSON response
+        """
+        key = (tag, pagination_token or '')
+        now = time.monotonic()
+
+        cached = self._pages.get(key)
+        if cached is None or cached[0] < now or (
+            cached[1].done() and (cached[1].cancelled() or cached[1].exception() is not None)
+        ):
+            future = asyncio.ensure_future(self._request_page(tag, pagination_token))
+            self._store_page(key, now + self.ttl, future)
+        else:
+            future = cached[1]
+
+        # Shielded so one caller giving up does not cancel the fetch for the others
+        return await asyncio.shield(future)
+
+class BaseRapidAPIDownloader:
+    """
+    Shared machinery for the RapidAPI hashtag downloaders: download history,
+    pooled HTTP session, hashtag paging and concurrent media downloads.
+    Subclasses pick which feed items they want and where to store them.
+    """
+
+    # Overridden by subclasses
+    media_key = 'media'
+    ext = 'bin'
+    directory = 'media'
+    log_file = 'instagram_downloader.log'
+
+    # Downloaded PKs per history file, shared by every downloader in the process
+    _pk_cache: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def setup_logging(cls):
+        """
+        Attach the downloader's rotating log file to its module logger.
+        Called once logging is configured; calling it again is a no-op.
+        """
+        logger = logging.getLogger(cls.__module__)
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                cls.log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+            )
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            logger.addHandler(queue_handler_for(handler))
+
+    def __init__(self, tags, max_items=3, concurrency=8, fetcher=None, queue=None):
+        """
+        :param tags: List of hashtags to search
+        :param max_items: Maximum number of media items to download per tag
+        :param concurrency: Maximum number of simultaneous media downloads, unless DOWNLOAD_CONCURRENCY is set
+        :param fetcher: Optional HashtagFetcher shared with other downloaders
+        :param queue: Optional asyncio.Queue that receives each file path as soon as it is ready
+        """
+        self.logger = logging.getLogger(type(self).__module__)
+
+        self.tags = tags
+        self.max_items = max_items
+        self._session = None
+        self.limiter = AsyncLimiter(max_rate=MEDIA_REQUESTS_PER_SECOND, time_period=1.0)
+
+        # Concurrency cap for media downloads, which also sizes the connection pool
+        self.download_concurrency = int(os.getenv('DOWNLOAD_CONCURRENCY', str(concurrency)))
+        self._download_semaphore = None
+        self.history_file = 'download_history.db'
+        self.legacy_history_file = 'download_history.csv'
+        self.db = None
+
+        # In-memory set to track downloaded PKs
+        self.downloaded_pks: Set[str] = set()
+
+        # Next pagination token per tag, and tags whose feed has no more pages
+        self.pagination_tokens: Dict[str, str] = {}
+        self._exhausted_tags: Set[str] = set()
+
+        # PKs with a download currently in flight, so concurrent tags never fetch the same item twice
+        self._pending_pks: Set[str] = set()
+
+        # Create directories
+        self.media_dir = Path(self.directory)
+        self.media_dir.mkdir(parents=True, exist_ok=True)
+
+        # Load existing download history into memory
+        self._load_download_history()
+
+        # Hashtag pages come from a fetcher, which may be shared so that
+        # downloaders searching the same tags reuse each other's API calls
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or HashtagFetcher(cache_file=self.history_file)
+        self.queue = queue
+
+        # Log initialization details
+        self.logger.info(f"Initialized downloader with tags: {tags}")
+        self.logger.info(f"Max {self.media_key}s per tag: {max_items}")
+        self.logger.info(f"Loaded {len(self.downloaded_pks)} existing PKs")
+
+    async def _get_session(self):
+        """
+        Lazily create one pooled session reused for every media download,
+        so keep-alive connections survive across tags and pagination requests
+        """
+        if self._session is None or self._session.closed:
+            # One connection per download slot, whichever CDN hosts the media is spread over
+            connector = aiohttp.TCPConnector(limit=self.download_concurrency, limit_per_host=0)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+            # Created here so it binds to the running event loop
+            self._download_semaphore = asyncio.Semaphore(self.download_concurrency)
+        return self._session
+
+    async def close(self):
+        """
+        Close the pooled HTTP session, the download history database
+        and the hashtag fetcher unless it was passed in
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if self._owns_fetcher:
+            await self.fetcher.close()
+
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _load_download_history(self):
+        """
+        Load download history into memory for fast lookup.
+        History lives in SQLite keyed by pk, so startup is a single index scan,
+        done once per process and shared between the video and image downloaders.
+        """
+        try:
+            # Autocommit keeps every write lock short, so downloaders sharing the file never block each other
+            self.db = sqlite3.connect(self.history_file, isolation_level=None)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS history('
+                'pk TEXT PRIMARY KEY, tag TEXT, ts REAL, url TEXT, filename TEXT)'
+            )
+
+            cache_key = os.path.abspath(self.history_file)
+            cached_pks = self._pk_cache.get(cache_key)
+            if cached_pks is not None:
+                self.downloaded_pks = cached_pks
+                return
+
+            # One-time import of the old CSV history
+            is_empty = self.db.execute('SELECT 1 FROM history LIMIT 1').fetchone() is None
+            if is_empty and os.path.exists(self.legacy_history_file):
+                with open(self.legacy_history_file, 'r') as csvfile:
+                    reader = csv.reader(csvfile)
+                    next(reader, None)
+
+                    with self.db:
+                        self.db.execute('BEGIN')
+                        self.db.executemany(
+                            'INSERT OR IGNORE INTO history(tag, pk, ts, url, filename) VALUES (?, ?, ?, ?, ?)',
+                            (row[:5] for row in reader if len(row) >= 5)
+                        )
+
+            self.downloaded_pks = {
+                pk for (pk,) in self.db.execute('SELECT pk FROM history')
+            }
+            self._pk_cache[cache_key] = self.downloaded_pks
+
+        except Exception as e:
+            self.logger.error(f"Error loading download history: {e}")
+            self.downloaded_pks = set()
+
+    def _is_downloaded(self, pk):
+        """
+        Check if an item with given pk has been previously downloaded
+        Using in-memory set for O(1) lookup
+
+        :param pk: Unique identifier for the item
+        :return: Boolean indicating if item was previously downloaded
+        """
+        return str(pk) in self.downloaded_pks
+
+    def _record_download(self, tag, pk, media_url, filename):
+        """
+        Record downloaded item in history database and in-memory set
+
+        :param tag: Hashtag used for download
+        :param pk: Unique item identifier
+        :param media_url: URL of the downloaded item
+        :param filename: Local filename of the downloaded item
+        """
+        try:
+            # Add to in-memory set
+            self.downloaded_pks.add(str(pk))
+
+            # Insert into history
+            self.db.execute(
+                'INSERT OR IGNORE INTO history(pk, tag, ts, url, filename) VALUES (?, ?, ?, ?, ?)',
+                (str(pk), tag, time.time(), media_url, filename)
+            )
+        except Exception as e:
+            self.logger.error(f"Error recording download history: {e}")
+
+    def _is_wanted(self, item):
+        """
+        Check whether a feed item has the media type this downloader handles
+
+        :param item: Item returned by the hashtag endpoint
+        :return: Boolean indicating if the item should be downloaded
+        """
+        raise NotImplementedError
+
+    def _extract_url(self, item):
+        """
+        Get the media URL of a feed item
+
+        :param item: Item returned by the hashtag endpoint
+        :return: Media URL, or None if the item has none
+        """
+        raise NotImplementedError
+
+    def _select_candidates(self, items):
+        """
+        Pick the downloadable items of a feed page up front, dropping known PKs
+        before any URL lookup or rate limiting happens
+
+        :param items: Items returned by the hashtag endpoint
+        :return: List of (pk, media_url) tuples
+        """
+        downloaded_pks = self.downloaded_pks
+        candidates = [
+            (str(item.get('pk')), self._extract_url(item)) for item in items
+            if self._is_wanted(item) and str(item.get('pk')) not in downloaded_pks
+        ]
+        return [(pk, media_url) for pk, media_url in candidates if media_url]
+
+    async def _publish(self, filename):
+        """
+        Hand a finished file to the consumer queue, if there is one
+
+        :param filename: Local filename of the downloaded item
+        """
+        if self.queue is not None:
+            await self.queue.put(filename)
+
+    async def _download_media(self, session, tag, pk, media_url):
+        """
+        Download a single media item and record it in the history
+
+        :param session: Shared aiohttp session
+        :param tag: Hashtag used for download
+        :param pk: Unique item identifier
+        :param media_url: URL of the item to download
+        :return: Local filename of the downloaded item, or None on failure
+        """
+        # Generate unique filename
+        path = self.media_dir / f"{tag}_{pk}_{self.media_key}.{self.ext}"
+        filename = str(path)
+
+        # A complete file from an earlier run only needs recording, not fetching again;
+        # files only get their final name once fully written, so any non-empty one is whole
+        if path.exists() and path.stat().st_size > 0:
+            self._record_download(tag, pk, media_url, filename)
+            self.logger.debug("Already on disk, skipping %s: %s", self.media_key, filename)
+            await self._publish(filename)
+            return filename
+
+        # Partial download, renamed into place once the body is complete
+        part_path = path.with_name(path.name + '.part')
+
+        self._pending_pks.add(str(pk))
+        try:
+            async with self._download_semaphore:
+                # Only wait when the rate limit bucket is empty
+                await self.limiter.acquire()
+
+                async with session.get(
+                    media_url,
+                    timeout=MEDIA_TIMEOUT
+                ) as media_response:
+                    if media_response.status != 200:
+                        return None
+
+                    # Stream media to disk instead of buffering the whole body in memory.
+                    # Socket reads often return less than asked, so they are gathered here
+                    # until a full chunk is ready; each write is then one executor round trip
+                    async with aiofiles.open(part_path, 'wb') as f:
+                        size = media_response.content_length
+                        if size:
+                            await asyncio.get_running_loop().run_in_executor(
+                                None, _preallocate, f.fileno(), size
+                            )
+
+                        written = 0
+                        buffer = bytearray()
+                        async for chunk in media_response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            buffer += chunk
+                            if len(buffer) >= DOWNLOAD_CHUNK_SIZE:
+                                written += await f.write(buffer)
+                                buffer.clear()
+                        if buffer:
+                            written += await f.write(buffer)
+
+                        # Drop preallocated space the body did not fill
+                        if size and written < size:
+                            await f.truncate(written)
+
+            os.replace(part_path, path)
+
+            # Record download in history
+            self._record_download(tag, pk, media_url, filename)
+
+            self.logger.debug("Successfully downloaded %s: %s", self.media_key, filename)
+            await self._publish(filename)
+            return filename
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            # OSError covers local failures such as a full disk while writing or renaming
+            self.logger.warning("Failed to download %s: %s", self.media_key, e)
+
+            # Don't leave a truncated file behind
+            try:
+                part_path.unlink()
+            except OSError:
+                pass
+            return None
+
+        finally:
+            self._pending_pks.discard(str(pk))
+
+    async def _download_page(self, session, tag, quota, pagination_token=None):
+        """
+        Fetch one page of a hashtag feed and download its media concurrently
+
+        :param session: Shared aiohttp session
+        :param tag: Hashtag to search
+        :param quota: Maximum number of items to download from this page
+        :param pagination_token: Optional pagination token for the page to fetch
+        :return: List of downloaded file paths, or None if the page could not be fetched,
+                 and the pagination token for the next page
+        """
+        try:
+            data = await self.fetcher.fetch(tag, pagination_token)
+
+            items = data.get('data', {}).get('items', [])
+            next_pagination_token = data.get('pagination_token')
+
+            # Randomly pick only as many candidates as could be needed
+            candidates = self._select_candidates(items)
+            candidates = random.sample(candidates, min(len(candidates), quota * CANDIDATE_OVERSAMPLE))
+
+        except Exception as e:
+            self.logger.error(f"Unexpected error processing tag {tag}: {e}")
+            return None, pagination_token
+
+        # Keep up to the remaining quota of downloads in flight and
+        # refill from the candidate pool whenever one fails
+        downloaded = []
+        pending = set()
+        try:
+            while True:
+                while candidates and len(pending) < quota - len(downloaded):
+                    pk, media_url = candidates.pop()
+
+                    # Another tag may have claimed this item since it was selected
+                    if self._is_downloaded(pk) or pk in self._pending_pks:
+                        continue
+                    pending.add(asyncio.ensure_future(self._download_media(session, tag, pk, media_url)))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # One unexpected failure only costs that item, not the rest of the page
+                    try:
+                        filename = task.result()
+                    except Exception as e:
+                        self.logger.error(f"Unexpected error downloading {self.media_key} for tag {tag}: {e}")
+                        continue
+
+                    if filename:
+                        downloaded.append(filename)
+        finally:
+            # Never leave downloads running unattended, e.g. when this page is cancelled
+            for task in pending:
+                task.cancel()
+
+        return downloaded, next_pagination_token
+
+    async def _download_tag(self, session, tag):
+        """
+        Page through one hashtag feed until its quota is met or the feed runs out.
+        The pagination token is kept per tag, so a later call resumes where this one stopped.
+
+        :param session: Shared aiohttp session
+        :param tag: Hashtag to search
+        :return: List of downloaded file paths
+        """
+        # Log start of hashtag processing
+        self.logger.info(f"Processing hashtag: {tag}")
+
+        downloaded = []
+        for _ in range(MAX_PAGES_PER_TAG):
+            if len(downloaded) >= self.max_items or tag in self._exhausted_tags:
+                break
+
+            files, next_pagination_token = await self._download_page(
+                session, tag, self.max_items - len(downloaded), self.pagination_tokens.get(tag)
+            )
+
+            # A failed fetch leaves the tag's position as it was, so a later call retries this page
+            if files is None:
+                break
+            downloaded.extend(files)
+
+            if next_pagination_token:
+                self.pagination_tokens[tag] = next_pagination_token
+            else:
+                self._exhausted_tags.add(tag)
+
+        return downloaded
+
+    async def download_from_hashtag(self):
+        """
+        Download media using RapidAPI hashtag endpoint with optimized history tracking and pagination.
+        All tags are processed concurrently over one pooled session, each paging independently.
+
+        :return: List of downloaded file paths
+        """
+        session = await self._get_session()
+        results = await asyncio.gather(*[
+            self._download_tag(session, tag)
+            for tag in self.tags
+        ])
+
+        downloaded = []
+        for files in results:
+            downloaded.extend(files)
+
+        self.logger.info(f"Total {self.media_key}s downloaded: {len(downloaded)}")
+        return downloaded
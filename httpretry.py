@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Retry policy shared by the RapidAPI hashtag endpoint and the upload API's JSON calls
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+
+# Upper bound in seconds on a server-supplied Retry-After wait
+MAX_RETRY_AFTER = 60
+
+async def request_with_retries(session, method, url, retry_statuses=RETRY_STATUSES,
+                               retry_errors=(aiohttp.ClientConnectionError,), semaphore=None, **kwargs):
+    """
+    Send a request, retrying with exponential backoff on throttling and gateway errors
+    and honouring the server's Retry-After hint on 429
+
+    :param session: Shared aiohttp session
+    :param method: HTTP method
+    :param url: Endpoint URL
+    :param retry_statuses: Response statuses that are retried
+    :param retry_errors: Connection errors that are retried
+    :param semaphore: Optional semaphore held for the duration of each attempt
+    :param kwargs: Passed on to session.request
+    :return: Response status, headers and raw body of the last attempt
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        delay = BACKOFF_FACTOR * (2 ** attempt)
+        try:
+            async with semaphore or nullcontext(), session.request(method, url, **kwargs) as response:
+                if response.status not in retry_statuses or attempt == MAX_RETRIES:
+                    return response.status, response.headers, await response.read()
+
+                logger.warning(f"{method} {url} returned {response.status}, retrying")
+
+                # Honour the server's throttling hint when it gives one in seconds
+                retry_after = response.headers.get('Retry-After', '')
+                if response.status == 429 and retry_after.isdigit():
+                    delay = min(int(retry_after), MAX_RETRY_AFTER)
+        except retry_errors:
+            if attempt == MAX_RETRIES:
+                raise
+
+        await asyncio.sleep(delay)
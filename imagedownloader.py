@@ -1,250 +1,75 @@
-import os
-import csv
-import requests
-import logging
-import time
-import random
-from typing import Set, Dict
+import asyncio
 
-from dotenv import load_dotenv
-load_dotenv()
+from basedownloader import BaseRapidAPIDownloader
 
-class InstagramImageDownloader:
-    def __init__(self, tags, max_images=3):
+class InstagramImageDownloader(BaseRapidAPIDownloader):
+    media_key = 'image'
+    ext = 'jpg'
+    directory = 'images'
+    log_file = 'instagram_image_downloader.log'
+
+    def __init__(self, tags, max_images=3, concurrency=8, fetcher=None, queue=None):
         """
         Optimized Instagram Image Downloader with in-memory download history
         
         :param tags: List of hashtags to search
         :param max_images: Maximum number of images to download per tag
+        :param concurrency: Maximum number of simultaneous media downloads, unless DOWNLOAD_CONCURRENCY is set
+        :param fetcher: Optional HashtagFetcher shared with other downloaders
+        :param queue: Optional asyncio.Queue that receives each file path as soon as it is ready
         """
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO, 
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('instagram_image_downloader.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        super().__init__(tags, max_images, concurrency, fetcher, queue)
 
-        self.tags = tags
-        self.max_images = max_images
-        self.images_directory = 'images'
-        self.history_file = 'download_history.csv'
-        
-        # In-memory set to track downloaded PKs
-        self.downloaded_pks: Set[str] = set()
-        
-        # Create directories
-        os.makedirs(self.images_directory, exist_ok=True)
-        
-        # Load existing download history into memory
-        self._load_download_history()
-        
-        # RapidAPI configuration
-        self.rapid_api_key = os.getenv('RAPID_API_KEY')
-        self.rapid_api_host = os.getenv('RAPID_API_HOST')
-        
-        # Headers for RapidAPI request
-        self.headers = {
-            'x-rapidapi-host': self.rapid_api_host,
-            'x-rapidapi-key': self.rapid_api_key
-        }
-        
-        # Log initialization details
-        self.logger.info(f"Initialized downloader with tags: {tags}")
-        self.logger.info(f"Max images per tag: {max_images}")
-        self.logger.info(f"Loaded {len(self.downloaded_pks)} existing image PKs")
-
-    def _load_download_history(self):
-        """
-        Load download history into memory for fast lookup
-        """
-        try:
-            # Create file if not exists
-            if not os.path.exists(self.history_file):
-                with open(self.history_file, 'w', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow([
-                        'tag', 
-                        'pk', 
-                        'timestamp', 
-                        'image_url', 
-                        'filename'
-                    ])
-            
-            # Read existing history
-            with open(self.history_file, 'r') as csvfile:
-                reader = csv.reader(csvfile)
-                next(reader) 
-                
-                self.downloaded_pks = {
-                    str(row[1]) for row in reader 
-                    if len(row) > 1
-                }
-        
-        except Exception as e:
-            self.logger.error(f"Error loading download history: {e}")
-            self.downloaded_pks = set()
-
-    def _is_image_downloaded(self, pk):
+    def _is_wanted(self, item):
         """
-        Check if an image with given pk has been previously downloaded
-        Using in-memory set for O(1) lookup
+        Check if item is an image
         
-        :param pk: Unique identifier for the image
-        :return: Boolean indicating if image was previously downloaded
+        :param item: Item returned by the hashtag endpoint
+        :return: Boolean indicating if the item is an image
         """
-        return str(pk) in self.downloaded_pks
+        return not item.get('is_video', True)
 
-    def _record_download(self, tag, pk, image_url, filename):
+    def _extract_url(self, item):
         """
-        Record downloaded image in history CSV and in-memory set
+        Get the first image URL from image_versions
         
-        :param tag: Hashtag used for download
-        :param pk: Unique image identifier
-        :param image_url: URL of the downloaded image
-        :param filename: Local filename of the downloaded image
+        :param item: Item returned by the hashtag endpoint
+        :return: Image URL, or None if the item has none
         """
-        try:
-            # Add to in-memory set
-            self.downloaded_pks.add(str(pk))
-            
-            # Append to CSV
-            with open(self.history_file, 'a', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([
-                    tag, 
-                    pk, 
-                    time.time(), 
-                    image_url, 
-                    filename
-                ])
-        except Exception as e:
-            self.logger.error(f"Error recording download history: {e}")
+        image_versions = item.get('image_versions', {}).get('items', [])
+        return image_versions[0].get('url') if image_versions else None
 
-    def download_images_from_hashtag(self, pagination_token=None):
+    async def download_images_from_hashtag(self):
         """
         Download images using RapidAPI hashtag endpoint with optimized history tracking and pagination
         
-        :param pagination_token: Optional pagination token for the next set of images
-        :return: List of downloaded image paths, pagination token for the next request
+        :return: List of downloaded image paths
         """
-        downloaded_images = []
-        
-        for tag in self.tags:
-            tag_image_count = 0
-            try:
-                # Log start of hashtag processing
-                self.logger.info(f"Processing hashtag: {tag}")
+        return await self.download_from_hashtag()
 
-                # Construct URL for hashtag search
-                url = f'https://{self.rapid_api_host}/v1/hashtag'
-                
-                # Query parameters
-                querystring = {"hashtag": tag}
-                if pagination_token:
-                    querystring['pagination_token'] = pagination_token
-                
-                # Log API request details
-                self.logger.info(f"Sending request to URL: {url}")
-                self.logger.info(f"Query parameters: {querystring}")
-                
-                # Make API request with timeout
-                response = requests.get(
-                    url, 
-                    headers=self.headers, 
-                    params=querystring,
-                    timeout=10
-                )
-                
-                # Log response details
-                self.logger.info(f"Response status code: {response.status_code}")
-                data = response.json()
-                
-                items = data.get('data', {}).get('items', [])
-                next_pagination_token = data.get('pagination_token')
-                
-                # Shuffle items to add randomness to selection
-                random.shuffle(items)
-                
-                for index, item in enumerate(items, 1):
-                    # Check if item is an image
-                    if not item.get('is_video', True):
-                        pk = item.get('pk')
-                        
-                        # Skip if image already downloaded
-                        if self._is_image_downloaded(pk):
-                            self.logger.info(f"Skipping already downloaded image with pk: {pk}")
-                            continue
-                        
-                        # Get the first image URL from image_versions
-                        image_versions = item.get('image_versions', {}).get('items', [])
-                        if image_versions:
-                            image_url = image_versions[0].get('url')
-                            
-                            if image_url:
-                                try:
-                                    # Add small random delay to avoid potential rate limiting
-                                    time.sleep(random.uniform(0.5, 1.5))
-                                    
-                                    image_response = requests.get(
-                                        image_url, 
-                                        timeout=15  # Timeout for image download
-                                    )
-                                    
-                                    if image_response.status_code == 200:
-                                        # Generate unique filename
-                                        filename = os.path.join(
-                                            self.images_directory, 
-                                            f"{tag}_{pk}_image.jpg"
-                                        )
-                                        
-                                        # Save image
-                                        with open(filename, 'wb') as f:
-                                            f.write(image_response.content)
-                                        
-                                        # Record download in history
-                                        self._record_download(tag, pk, image_url, filename)
-                                        
-                                        downloaded_images.append(filename)
-                                        self.logger.info(f"Successfully downloaded image: {filename}")
-                                        tag_image_count += 1
-                                
-                                except requests.exceptions.RequestException as e:
-                                    self.logger.warning(f"Failed to download image: {e}")
-                    
-                    # Break if max images per tag is reached
-                    if tag_image_count >= self.max_images:
-                        break
-                
-                # Return the list of downloaded images and the next pagination token
-                return downloaded_images, next_pagination_token
-            
-            except Exception as e:
-                self.logger.error(f"Unexpected error processing tag {tag}: {e}")
-        
-        self.logger.info(f"Total images downloaded: {len(downloaded_images)}")
-        return downloaded_images, None
+async def async_download_instagram_images(tags, max_images=3, fetcher=None, queue=None):
+    """
+    Download Instagram images with pagination from within a running event loop
+    
+    :param tags: List of hashtags to search
+    :param max_images: Maximum number of images to download per tag
+    :param fetcher: Optional HashtagFetcher, shared to reuse hashtag pages across downloaders
+    :param queue: Optional asyncio.Queue that receives each file path as soon as it is ready
+    :return: List of downloaded image paths
+    """
+    downloader = InstagramImageDownloader(tags, max_images, fetcher=fetcher, queue=queue)
+    try:
+        return await downloader.download_images_from_hashtag()
+    finally:
+        await downloader.close()
 
 def download_instagram_images(tags, max_images=3):
     """
     Convenience function to download Instagram images
-    
+
     :param tags: List of hashtags to search
     :param max_images: Maximum number of images to download per tag
     :return: List of downloaded image paths
     """
-    downloader = InstagramImageDownloader(tags, max_images)
-    downloaded_images = []
-    pagination_token = None
-    
-    while len(downloaded_images) < max_images * len(tags):
-        new_images, pagination_token = downloader.download_images_from_hashtag(pagination_token)
-        downloaded_images.extend(new_images)
-        
-        if not pagination_token:
-            break
-    
-    return downloaded_images
+    InstagramImageDownloader.setup_logging()
+    return asyncio.run(async_download_instagram_images(tags, max_images))
@@ -1,36 +1,93 @@
 import os
 import sys
+import json
+import hashlib
 import asyncio
 import logging
+import threading
 from typing import List
 from dotenv import load_dotenv
+from tqdm import tqdm
+
+# uvloop is optional; without it the default asyncio event loop is used
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Gemini API imports
 import google.generativeai as genai
 
 # Assuming these modules exist in the same directory
-from instadownloader import download_instagram_videos
-from imagedownloader import download_instagram_images
+from instadownloader import InstagramVideoDownloader, async_download_instagram_videos
+from imagedownloader import InstagramImageDownloader, async_download_instagram_images
+from basedownloader import HashtagFetcher, queue_handler_for
 from videouploader import SimpleVideoUploader
 
 # Load environment variables
 load_dotenv()
 
+# Generated hashtags per normalized prompt, kept across runs
+HASHTAG_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'insta-bot', 'hashtags.json')
+_hashtag_cache = None
+
+# Upload workers running alongside the downloads, which also caps simultaneous connections
+# to the upload API, and how many finished files may wait for them
+N_UPLOAD_WORKERS = int(os.getenv('UPLOAD_CONCURRENCY', '4'))
+UPLOAD_QUEUE_SIZE = 32
+
 def setup_logging():
     """
     Configure logging for the main application.
     Provides clear, informative logging to track the entire process.
+    Records are written by a background listener thread, so logging never blocks the event loop.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - [%(levelname)s] %(message)s',
-        handlers=[
-            logging.FileHandler('media_workflow.log'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter('%(asctime)s - [%(levelname)s] %(message)s')
+    handlers = [
+        logging.FileHandler('media_workflow.log'),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # force replaces the handlers the imported modules already installed on the root logger
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler_for(*handlers)], force=True)
+
+    # Each downloader also keeps its own log file
+    InstagramVideoDownloader.setup_logging()
+    InstagramImageDownloader.setup_logging()
     return logging.getLogger(__name__)
 
+def load_hashtag_cache() -> dict:
+    """
+    Load the hashtag cache from disk, once per process
+
+    :return: Dict mapping prompt hashes to generated hashtags
+    """
+    global _hashtag_cache
+    if _hashtag_cache is None:
+        try:
+            with open(HASHTAG_CACHE_FILE, 'r') as f:
+                _hashtag_cache = json.load(f)
+        except (OSError, ValueError):
+            _hashtag_cache = {}
+    return _hashtag_cache
+
+def save_hashtag_cache(cache: dict):
+    """
+    Persist the hashtag cache, replacing the file atomically
+
+    :param cache: Dict mapping prompt hashes to generated hashtags
+    """
+    try:
+        os.makedirs(os.path.dirname(HASHTAG_CACHE_FILE), exist_ok=True)
+        tmp_file = HASHTAG_CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, HASHTAG_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not save hashtag cache: {e}")
+
 def generate_motivational_hashtags(prompt: str, model: genai.GenerativeModel) -> List[str]:
     """
     Generate motivational and positive hashtags using Gemini API
@@ -39,6 +96,12 @@ def generate_motivational_hashtags(prompt: str, model: genai.GenerativeModel) ->
     :param model: Gemini AI model
     :return: List of generated motivational hashtags
     """
+    # Identical prompts reuse earlier hashtags instead of calling Gemini again
+    cache = load_hashtag_cache()
+    cache_key = hashlib.sha256(prompt.strip().lower().encode('utf-8')).hexdigest()
+    if cache_key in cache:
+        return list(cache[cache_key])
+
     try:
         hashtag_prompt = f"""Transform the following input into ONLY motivational, positive, and inspiring Instagram hashtags. 
         Avoid negative or demotivational tags. Focus on empowerment, growth, and positivity.
@@ -60,7 +123,8 @@ def generate_motivational_hashtags(prompt: str, model: genai.GenerativeModel) ->
         #personalgrowth #successmindset #positivevibes #believeinyourself
         """
         
-        response = model.generate_content(hashtag_prompt)
+        # Zero temperature keeps the output reproducible, so it is safe to cache
+        response = model.generate_content(hashtag_prompt, generation_config={'temperature': 0.0})
         
         # Split the response and clean up hashtags
         all_hashtags = []
@@ -78,6 +142,10 @@ def generate_motivational_hashtags(prompt: str, model: genai.GenerativeModel) ->
                 '#personalgrowth', '#positivevibes', 
                 '#believeinyourself'
             ]
+        else:
+            # Only real generations are cached, so a fallback is retried next run
+            cache[cache_key] = unique_hashtags
+            save_hashtag_cache(cache)
         
         return unique_hashtags
     except Exception as e:
@@ -124,6 +192,67 @@ def get_user_confirmation(prompt: str) -> bool:
         else:
             print("Please respond with 'yes' or 'no'.")
 
+def run_in_daemon_thread(func, *args) -> asyncio.Future:
+    """
+    Run a blocking call such as an input prompt without blocking the event loop.
+    A daemon thread is used instead of the default executor so that a prompt
+    left waiting on stdin never holds up interpreter exit after Ctrl+C.
+
+    :param func: Blocking function to call
+    :param args: Positional arguments for func
+    :return: Future resolving to the function's result
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        result, error = None, None
+        try:
+            result = func(*args)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+async def upload_worker(uploader: SimpleVideoUploader, queue: asyncio.Queue, results: List[bool],
+                        category_id: int, pbar: tqdm):
+    """
+    Upload media files taken from the queue until a None sentinel arrives
+
+    :param uploader: Shared uploader instance
+    :param queue: Queue of downloaded media paths
+    :param results: List collecting the result of each upload
+    :param category_id: Category to post the media under
+    :param pbar: Progress bar shared by every upload
+    """
+    while True:
+        media = await queue.get()
+        if media is None:
+            return
+
+        media_filename = os.path.basename(media)
+        pbar.write(f"Uploading: {media_filename}")
+        try:
+            results.append(await uploader.upload_single_video(media, category_id=category_id, pbar=pbar))
+        except Exception:
+            # Count it as a failure and keep the worker alive for the rest of the queue
+            logging.getLogger(__name__).exception(f"Upload of {media_filename} raised")
+            results.append(False)
+
 async def async_main():
     """
     Asynchronous main workflow orchestrating video and image download and upload process.
@@ -139,6 +268,13 @@ async def async_main():
             print("❌ Error: GEMINI_API_KEY not found in .env file")
             sys.exit(1)
         
+        # Check the upload token now rather than after the downloads have run
+        FLIC_TOKEN = os.getenv('FLIC_TOKEN')
+        CATEGORY_ID = 25
+        if not FLIC_TOKEN:
+            print("❌ Error: FLIC_TOKEN not found in .env file")
+            sys.exit(1)
+
         genai.configure(api_key=GEMINI_API_KEY)
         gemini_model = genai.GenerativeModel('gemini-pro')
         
@@ -147,10 +283,12 @@ async def async_main():
         print("---------------------------------------")
         
         # Collect User Prompt
-        user_prompt = input("Enter your motivation/goal prompt: ").strip()
+        user_prompt = (await run_in_daemon_thread(input, "Enter your motivation/goal prompt: ")).strip()
         
         # Generate Motivational Hashtags
-        tags = generate_motivational_hashtags(user_prompt, gemini_model)
+        tags = await asyncio.get_running_loop().run_in_executor(
+            None, generate_motivational_hashtags, user_prompt, gemini_model
+        )
         
         # Validate tags
         if not validate_inputs(tags, 1, "tags"):
@@ -168,88 +306,76 @@ async def async_main():
         logger.info(f"Starting workflow with prompt: {user_prompt}")
         logger.info(f"Generated Motivational Hashtags: {tags}")
         logger.info(f"Videos per tag: {videos_per_tag}, Images per tag: {images_per_tag}")
+
+        # Ask for upload confirmation up front, so uploads can start while downloads are still running
+        proceed_with_upload = await run_in_daemon_thread(
+            get_user_confirmation, "\n🤔 Do you want to upload the media files as they are downloaded?"
+        )
+
+        # The uploader's pooled session is only opened once the first upload starts,
+        # and is closed when every worker has finished
+        async with SimpleVideoUploader(FLIC_TOKEN, CATEGORY_ID) as uploader:
+            # Stage 2: Media Upload, running alongside the downloads
+            # Workers upload each file as soon as a downloader puts it on the queue
+            upload_queue = None
+            upload_results = []
+            upload_workers = []
+            upload_pbar = None
+            if proceed_with_upload:
+                print("\n📤 Media will be uploaded as soon as it is downloaded...")
+                upload_queue = asyncio.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+
+                # One progress bar for all uploads instead of one per file; its total grows as files arrive
+                upload_pbar = tqdm(total=0, unit='B', unit_scale=True, desc='Uploading', mininterval=0.25)
+                upload_workers = [
+                    asyncio.create_task(
+                        upload_worker(uploader, upload_queue, upload_results, CATEGORY_ID, upload_pbar)
+                    )
+                    for _ in range(N_UPLOAD_WORKERS)
+                ]
+
+            # Stage 1: Video and Image Download
+            # Both downloaders take every tag at once and run side by side,
+            # sharing one fetcher so each hashtag page is requested only once
+            print("\n🎥📸 Downloading Motivational Videos and Images...")
+            fetcher = HashtagFetcher()
+            try:
+                downloaded_videos, downloaded_images = await asyncio.gather(
+                    async_download_instagram_videos(tags, videos_per_tag, fetcher=fetcher, queue=upload_queue),
+                    async_download_instagram_images(tags, images_per_tag, fetcher=fetcher, queue=upload_queue)
+                )
+            finally:
+                await fetcher.close()
         
-        # Stage 1: Video Download
-        print("\n🎥 Downloading Motivational Videos...")
-        downloaded_videos = []
-        for tag in tags:
-            videos = download_instagram_videos([tag], videos_per_tag)
-            downloaded_videos.extend(videos)
-            
-            # Break if we've reached our desired number of videos
-            if len(downloaded_videos) >= len(tags) * videos_per_tag:
-                break
-        
+                # Everything downloaded is queued by now; one sentinel per worker lets them finish
+                for _ in upload_workers:
+                    await upload_queue.put(None)
+                await asyncio.gather(*upload_workers)
+
+                if upload_pbar is not None:
+                    upload_pbar.close()
+
         print(f"✅ Successfully downloaded {len(downloaded_videos)} videos.")
-        
-        # Stage 2: Image Download
-        print("\n📸 Downloading Motivational Images...")
-        downloaded_images = []
-        for tag in tags:
-            images = download_instagram_images([tag], images_per_tag)
-            downloaded_images.extend(images)
-            
-            # Break if we've reached our desired number of images
-            if len(downloaded_images) >= len(tags) * images_per_tag:
-                break
-        
         print(f"✅ Successfully downloaded {len(downloaded_images)} images.")
         
-        # Combine downloaded media
-        downloaded_media = downloaded_videos + downloaded_images
+        total_media = len(downloaded_videos) + len(downloaded_images)
         
         # Check if any media was downloaded
-        if not downloaded_media:
+        if not total_media:
             print("❌ No media were downloaded. Check your internet connection or API limits.")
             sys.exit(1)
         
-        # Confirmation before upload
-        print("\n📤 Media Download Complete")
-        print("Media Files:")
-        for media in downloaded_media:
-            print(f"  - {os.path.basename(media)}")
-        
-        # Ask for upload confirmation
-        proceed_with_upload = get_user_confirmation("\n🤔 Do you want to proceed with uploading these media files?")
-        
         if not proceed_with_upload:
             print("❌ Upload cancelled by user. Media files are saved locally.")
             sys.exit(0)
         
-        # Stage 3: Video Upload
-        print("\n📤 Starting Media Upload...")
-        
-        FLIC_TOKEN = os.getenv('FLIC_TOKEN')
-        CATEGORY_ID = 25
-        
-        # Initialize Uploader
-        uploader = SimpleVideoUploader(FLIC_TOKEN, CATEGORY_ID)
-        
-        # Upload each downloaded media file asynchronously
-        upload_tasks = []
-        for media in downloaded_media:
-            media_filename = os.path.basename(media)
-            print(f"\nUploading: {media_filename}")
-            
-            # Create upload task
-            upload_task = asyncio.create_task(
-                uploader.upload_single_video(
-                    media_filename, 
-                    category_id=CATEGORY_ID
-                )
-            )
-            upload_tasks.append(upload_task)
-        
-        # Wait for all uploads to complete
-        upload_results = await asyncio.gather(*upload_tasks)
-        
         # Count successful and failed uploads
-        successful_uploads = upload_results.count(True)
-        failed_uploads = upload_results.count(False)
+        successful_uploads = sum(1 for result in upload_results if result is True)
+        failed_uploads = len(upload_results) - successful_uploads
         
         # Final Summary
         print("\n📊 Upload Summary:")
-        print(f"Total Media: {len(downloaded_media)}")
+        print(f"Total Media: {total_media}")
         print(f"Successful Uploads: {successful_uploads}")
         print(f"Failed Uploads: {failed_uploads}")
         
@@ -268,7 +394,14 @@ def main():
     """
     Synchronous wrapper for async main function
     """
-    asyncio.run(async_main())
+    if uvloop is None:
+        asyncio.run(async_main())
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(async_main())
+    else:
+        uvloop.install()
+        asyncio.run(async_main())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
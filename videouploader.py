@@ -1,11 +1,14 @@
 import os
 import logging
-import json
-import asyncio
+import orjson
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import aiofiles
 import aiohttp
 from tqdm import tqdm
 
+from httpretry import RETRY_STATUSES, request_with_retries
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, 
@@ -13,101 +16,213 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Connect / per-read timeouts; no total limit, so a large upload on a busy uplink can finish
+UPLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+
 class SimpleVideoUploader:
-    def __init__(self, flic_token, category_id , chunk_size=5 * 1024 * 1024):  # 5MB chunks
+    def __init__(self, flic_token, category_id=25, chunk_size=1024 * 1024):  # 1MB chunks
         self.flic_token = flic_token
         self.chunk_size = chunk_size
         self.base_url = 'https://api.socialverseapp.com'
         self.category_id = category_id
+        self._session = None
+        self._read_pool = None
+
+        # Request headers are the same for every call, so build them once
+        self._json_headers = {
+            'Flic-Token': flic_token,
+            'Content-Type': 'application/json'
+        }
+        self._video_headers = {'Content-Type': 'video/mp4'}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self):
+        """Lazily create one pooled session shared by every upload and API call"""
+        if self._session is None or self._session.closed:
+            # Cache DNS and keep idle connections around longer, so the short JSON calls
+            # between uploads reuse a warm TLS connection instead of resolving and handshaking again
+            connector = aiohttp.TCPConnector(
+                limit=64,
+                limit_per_host=16,
+                ttl_dns_cache=600,
+                keepalive_timeout=75
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=UPLOAD_TIMEOUT)
+        return self._session
+
+    def _get_read_pool(self):
+        """Lazily create a dedicated thread pool for upload file reads"""
+        if self._read_pool is None:
+            self._read_pool = ThreadPoolExecutor(
+                max_workers=max(8, os.cpu_count() or 1),
+                thread_name_prefix='upload-read'
+            )
+        return self._read_pool
+
+    async def close(self):
+        """Close the pooled session and the file read pool"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if self._read_pool is not None:
+            self._read_pool.shutdown(wait=False)
+            self._read_pool = None
+
+    async def _request_json(self, method, url, retry_statuses=RETRY_STATUSES, **kwargs):
+        """Send an API request and decode its JSON body, retrying with exponential backoff"""
+        session = await self._get_session()
+        status, _, body = await request_with_retries(
+            session,
+            method,
+            url,
+            retry_statuses=retry_statuses,
+            # Only retry when the connection was never made, so even a POST is safe to repeat
+            retry_errors=(aiohttp.ClientConnectorError,),
+            **kwargs
+        )
+        # An empty body decodes to None, as response.json() did
+        return status, orjson.loads(body) if body.strip() else None
 
     async def get_upload_url(self, file_size):
         """Generate pre-signed upload URL"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f'{self.base_url}/posts/generate-upload-url', 
-                headers={
-                    'Flic-Token': self.flic_token,
-                    'Content-Type': 'application/json'
-                },
-                json={'file_size': file_size}
-            ) as response:
-                data = await response.json()
-                logger.info(f"Upload URL Response: {json.dumps(data, indent=2)}")
+        status, data = await self._request_json(
+            'GET',
+            f'{self.base_url}/posts/generate-upload-url',
+            headers=self._json_headers,
+            # The endpoint expects its parameters as a JSON body even on GET
+            data=orjson.dumps({'file_size': file_size})
+        )
+        logger.debug("Upload URL Response: %s", data)
                 
-                if data.get('status') != 'success':
-                    raise ValueError("Failed to get upload URL")
+        if not isinstance(data, dict) or data.get('status') != 'success':
+            raise ValueError("Failed to get upload URL")
                 
-                return data.get('url'), data.get('hash')
+        return data.get('url'), data.get('hash')
 
-    async def chunked_upload(self, file_path, upload_url):
-        """Upload file in chunks with progress tracking"""
-        file_size = os.path.getsize(file_path)
+    async def chunked_upload(self, file_path, upload_url, file_size=None, pbar=None):
+        """Stream the file to the pre-signed URL in a single PUT with progress tracking"""
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
         
-        # Use tqdm for progress bar
-        with tqdm(total=file_size, unit='B', unit_scale=True, desc=os.path.basename(file_path)) as pbar:
-            async with aiofiles.open(file_path, 'rb') as f:
-                async with aiohttp.ClientSession() as session:
-                    async with session.put(upload_url, headers={'Content-Type': 'video/mp4'}) as response:
-                        while True:
-                            chunk = await f.read(self.chunk_size)
-                            if not chunk:
-                                break
+        # Use tqdm for progress bar, unless the caller passes a bar shared by several uploads;
+        # redraws are capped to a few per second and roughly every half percent
+        shared_bar = pbar is not None
+        if not shared_bar:
+            progress = tqdm(
+                total=file_size,
+                unit='B',
+                unit_scale=True,
+                desc=os.path.basename(file_path),
+                mininterval=0.25,
+                miniters=max(1, file_size // 200)
+            )
+        else:
+            progress = nullcontext(pbar)
+
+        with progress as pbar:
+            sent = 0
+
+            def discount_unsent():
+                # A failed upload will not send the rest, so take it back off a shared bar
+                if shared_bar:
+                    pbar.total -= file_size - sent
+                    pbar.refresh()
+
+            async def file_sender():
+                nonlocal sent
+                # Read the file in chunks as the request body is sent, so it is never fully in memory
+                async with aiofiles.open(file_path, 'rb', executor=self._get_read_pool()) as f:
+                    # The whole file is read front to back once; let the kernel read ahead aggressively
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+                    while True:
+                        chunk = await f.read(self.chunk_size)
+                        if not chunk:
+                            break
                             
-                            try:
-                                async with session.put(upload_url, data=chunk) as chunk_response:
-                                    if chunk_response.status not in [200, 204]:
-                                        logger.error(f"Chunk upload failed: {chunk_response.status}")
-                                        return False
+                        sent += len(chunk)
+                        pbar.update(len(chunk))
+                        yield chunk
                                 
-                                pbar.update(len(chunk))
-                            except Exception as e:
-                                logger.error(f"Chunk upload error: {e}")
-                                return False
+            try:
+                # An explicit Content-Length keeps aiohttp from falling back to chunked encoding,
+                # which pre-signed upload URLs generally reject
+                session = await self._get_session()
+                async with session.put(
+                    upload_url,
+                    data=file_sender(),
+                    headers={**self._video_headers, 'Content-Length': str(file_size)}
+                ) as response:
+                    if response.status not in [200, 204]:
+                        logger.error(f"Upload failed: {response.status}")
+                        discount_unsent()
+                        return False
                         
-                        return True
+                    return True
+            except Exception as e:
+                logger.error(f"Upload error: {e}")
+                discount_unsent()
+                return False
 
-    async def create_post(self, file_path, file_hash, category_id=25):
+    async def create_post(self, file_path, file_hash, category_id=None, title_stem=None):
         """Create post after successful upload"""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f'{self.base_url}/posts', 
-                headers={
-                    'Flic-Token': self.flic_token,
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'title': f'{os.path.splitext(os.path.basename(file_path))[0]}_upload',
-                    'hash': file_hash,
-                    'is_available_in_public_feed': False,
-                    'category_id': category_id
-                }
-            ) as response:
-                response_data = await response.json()
-                logger.info(f"Post Response: {json.dumps(response_data, indent=2)}")
+        if category_id is None:
+            category_id = self.category_id
+        if title_stem is None:
+            title_stem = os.path.splitext(os.path.basename(file_path))[0]
+
+        # Only throttled requests are retried; after a 5xx the post may already exist
+        status, response_data = await self._request_json(
+            'POST',
+            f'{self.base_url}/posts',
+            retry_statuses={429},
+            headers=self._json_headers,
+            data=orjson.dumps({
+                'title': f'{title_stem}_upload',
+                'hash': file_hash,
+                'is_available_in_public_feed': False,
+                'category_id': category_id
+            })
+        )
+        logger.debug("Post Response: %s", response_data)
                 
-                return response.status in [200, 201]
+        return status in [200, 201]
 
-    async def upload_single_video(self, file_path, category_id=25):
+    async def upload_single_video(self, file_path, category_id=None, pbar=None):
         """Main upload method with comprehensive error handling"""
         try:
-            # Ensure full path if only filename is provided
-            if not os.path.isabs(file_path):
+            # Ensure full path if only a bare filename is provided
+            if not os.path.dirname(file_path):
                 file_path = os.path.join('videos', file_path)
             
-            file_size = os.path.getsize(file_path)
+            # Stat the file and derive its title once, rather than in every step
+            file_size = os.stat(file_path).st_size
+            title_stem = os.path.splitext(os.path.basename(file_path))[0]
             
             # Get upload URL
             upload_url, file_hash = await self.get_upload_url(file_size)
+
+            # A shared progress bar grows as each upload starts sending
+            if pbar is not None:
+                pbar.total += file_size
+                pbar.refresh()
             
             # Chunked upload
-            upload_success = await self.chunked_upload(file_path, upload_url)
+            upload_success = await self.chunked_upload(file_path, upload_url, file_size, pbar)
             
             if not upload_success:
                 logger.error("Video upload failed")
                 return False
             
             # Create post
-            post_success = await self.create_post(file_path, file_hash, category_id)
+            post_success = await self.create_post(file_path, file_hash, category_id, title_stem)
             
             if not post_success:
                 logger.error("Post creation failed")